@@ -7,12 +7,15 @@ BIG BARBER BATTLE - WEB EDITION (ASYNC PATCHED)
 from __future__ import annotations
 
 import asyncio  # <--- CRUCIAAL VOOR WEB
+import bisect
+import concurrent.futures
+import functools
 import json
 import math
 import os
 import random
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 # ------------------------------------------------------------
@@ -30,174 +33,366 @@ except Exception as e:
     # Geen sys.exit() in web mode, dat crasht de tab
     pass
 
+try:
+    import orjson
+    _json_loads, _json_dumps = orjson.loads, orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    def _json_dumps(data) -> bytes: return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
 WIDTH, HEIGHT = 1280, 720
 FPS = 60
 
+# In WASM is er geen bestandssysteem dat een reload overleeft (geen LocalStorage bridge).
+CAN_PERSIST = sys.platform != "emscripten"
+HS_FILE = Path(__file__).with_name("highscores.json")
+
 # Web-safe colors
-COLORS = {
-    "WALL_DARK": (20, 20, 25),
-    "FLOOR_WOOD": (100, 70, 45),
-    "SKIN": (235, 195, 165),
-    "TATTOO": (60, 60, 75),
-    "NEON_RED": (255, 20, 50),
-    "NEON_GLOW": (255, 80, 80),
-    "GOLD": (218, 165, 32),
-    "DENIM": (60, 80, 110),
-    "BLACK": (10, 10, 12),
-    "WHITE": (240, 240, 240),
-    "GREEN": (50, 200, 100),
-    "ORANGE": (255, 140, 0)
-}
+WALL_DARK = (20, 20, 25)
+FLOOR_WOOD = (100, 70, 45)
+SKIN = (235, 195, 165)
+TATTOO = (60, 60, 75)
+NEON_RED = (255, 20, 50)
+NEON_GLOW = (255, 80, 80)
+GOLD = (218, 165, 32)
+DENIM = (60, 80, 110)
+BLACK = (10, 10, 12)
+WHITE = (240, 240, 240)
+GREEN = (50, 200, 100)
+ORANGE = (255, 140, 0)
 
 # ------------------------------------------------------------
 # 2. UTILS
 # ------------------------------------------------------------
 def clamp(v, lo, hi): return max(lo, min(hi, v))
+def _clamp_color(c) -> tuple: return (max(0, min(255, int(c[0]))), max(0, min(255, int(c[1]))), max(0, min(255, int(c[2]))))
 
+@functools.lru_cache(maxsize=16)
 def load_font(size: int = 36) -> pygame.freetype.Font:
     # WebAssembly heeft geen systeempaden, we gebruiken de default
     # of we zouden een .ttf bestand mee moeten sturen.
     # Voor nu: Default is veiligst.
     return pygame.freetype.SysFont(None, size)
 
-def draw_neon_text(dst: Surface, text: str, font: pygame.freetype.Font, pos: tuple, color: tuple, glow_color: tuple, center: bool = False, scale: float = 1.0):
-    sc = (int(clamp(color[0],0,255)), int(clamp(color[1],0,255)), int(clamp(color[2],0,255)))
-    gc = (int(clamp(glow_color[0],0,255)), int(clamp(glow_color[1],0,255)), int(clamp(glow_color[2],0,255)))
-
-    surf, rect = font.render(text, fgcolor=sc)
-    if scale != 1.0:
-        w = int(surf.get_width() * scale)
-        h = int(surf.get_height() * scale)
-        surf = pygame.transform.smoothscale(surf, (w, h))
-        rect = surf.get_rect()
-    
+@functools.lru_cache(maxsize=256)
+def _render_text(font: pygame.freetype.Font, text: str, color: tuple) -> Surface:
+    """Gecachete font.render voor strings die steeds terugkomen."""
+    surf, _ = font.render(text, fgcolor=color)
+    return surf.convert_alpha()
+
+def _new_alpha(size: tuple) -> Surface:
+    """Lege SRCALPHA-surface, meteen in display-formaat: geen losse convert_alpha()-kopie achteraf."""
+    return pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+
+_GLOW_SCRATCH: Surface | None = None
+
+def _glow_scratch(size: tuple) -> Surface:
+    """Herbruikbare blur-werksurface; groeit alleen als een glow groter is dan ooit."""
+    global _GLOW_SCRATCH
+    if _GLOW_SCRATCH is None or _GLOW_SCRATCH.get_width() < size[0] or _GLOW_SCRATCH.get_height() < size[1]:
+        old = _GLOW_SCRATCH.get_size() if _GLOW_SCRATCH else (0, 0)
+        _GLOW_SCRATCH = _new_alpha((max(old[0], size[0]), max(old[1], size[1])))
+    return _GLOW_SCRATCH.subsurface((0, 0), size)
+
+def _neon_layers(text: str, font: pygame.freetype.Font, color: tuple, glow_color: tuple, size: float) -> tuple[Surface, Surface, tuple, Rect]:
+    """Premultiplied tekst en glow, nog los; geeft (tekst, glow, tekst-offset in glow, render-rect)."""
+    # Direct op doelgrootte renderen i.p.v. renderen + smoothscale.
+    # Kleuren pas hier clampen: alleen bij een cache-miss.
+    color, glow_color = _clamp_color(color), _clamp_color(glow_color)
+    surf, r = font.render(text, fgcolor=color, size=size)
+    w, h = surf.get_size()
+
+    # Glow: de tekst een keer in glow-kleur, dan blur in C. Twee box-passes benaderen
+    # een gaussian en zijn, anders dan gaussian_blur, niet trager bij grotere radius.
+    # RGB staat overal al op glow_color, zodat de blur alleen alpha uitsmeert.
+    glow = _new_alpha((w+60, h+60))
+    glow.fill((*glow_color, 0))
+    off = (glow.get_width()//2 - w//2, glow.get_height()//2 - h//2)
+    font.render_to(glow, off, text, fgcolor=glow_color, size=size)
+    # Heen naar de scratch, terug in glow: geen twee nieuwe blur-surfaces per miss.
+    tmp = _glow_scratch(glow.get_size())
+    pygame.transform.box_blur(glow, 6, dest_surface=tmp)
+    pygame.transform.box_blur(tmp, 6, dest_surface=glow)
+    glow.premul_alpha_ip()
+
+    surf.premul_alpha_ip()
+    return surf, glow, off, r
+
+@functools.lru_cache(maxsize=128)
+def _render_neon(text: str, font: pygame.freetype.Font, color: tuple, glow_color: tuple, scale: float) -> tuple[Surface, tuple, tuple]:
+    """Bakt glow + tekst samen tot een premultiplied Surface; geeft (surf, tekst-offset, tekst-grootte)."""
+    surf, glow, off, _ = _neon_layers(text, font, color, glow_color, font.size * scale)
+    glow.blit(surf, off, special_flags=pygame.BLEND_PREMULTIPLIED)
+    return glow, off, surf.get_size()
+
+def _blit_neon(dst: Surface, baked: tuple, pos: tuple, center: bool) -> Rect:
+    surf, (ox, oy), size = baked
+    rect = Rect((0, 0), size)
     if center: rect.center = pos
     else: rect.topleft = pos
+    return dst.blit(surf, (rect.x - ox, rect.y - oy), special_flags=pygame.BLEND_PREMULTIPLIED)
 
-    glow = pygame.Surface((rect.width+60, rect.height+60), pygame.SRCALPHA)
-    for r in range(4, 24, 4):
-        alpha = int(40 * (1.0 - r/25.0))
-        g_surf, _ = font.render(text, fgcolor=gc)
-        factor = 1 + r/30.0
-        gw, gh = int(g_surf.get_width()*factor), int(g_surf.get_height()*factor)
-        g_surf = pygame.transform.smoothscale(g_surf, (gw, gh))
-        
-        temp = pygame.Surface(glow.get_size(), pygame.SRCALPHA)
-        gr = g_surf.get_rect(center=(glow.get_width()//2, glow.get_height()//2))
-        temp.blit(g_surf, gr)
-        temp.fill((255,255,255,alpha), special_flags=pygame.BLEND_RGBA_MULT)
-        glow.blit(temp, (0,0), special_flags=pygame.BLEND_PREMULTIPLIED)
-    
-    dst.blit(glow, (rect.centerx - glow.get_width()//2, rect.centery - glow.get_height()//2), special_flags=pygame.BLEND_PREMULTIPLIED)
-    dst.blit(surf, rect)
+def draw_neon_text(dst: Surface, text: str, font: pygame.freetype.Font, pos: tuple, color: tuple, glow_color: tuple, center: bool = False, scale: float = 1.0):
+    return _blit_neon(dst, _render_neon(text, font, color, glow_color, scale), pos, center)
+
+@functools.lru_cache(maxsize=256)
+def _neon_glyph(ch: str, font: pygame.freetype.Font, color: tuple, glow_color: tuple, scale: float) -> tuple:
+    """Een neon-teken als losse (glow, tekst) lagen; geeft (glow, tekst, (bearing-x, bearing-y), advance)."""
+    size = font.size * scale
+    adv = font.get_metrics(ch, size=size)[0][4]
+    if ch.isspace(): return None, None, (0, 0), adv
+    surf, glow, _, r = _neon_layers(ch, font, color, glow_color, size)
+    return glow, surf.convert_alpha(), (r.x, r.y), adv
+
+@functools.lru_cache(maxsize=64)
+def _compose_neon(text: str, font: pygame.freetype.Font, color: tuple, glow_color: tuple, scale: float) -> tuple[Surface, tuple, tuple]:
+    """Als _render_neon, maar opgebouwd uit gecachete tekens: een nieuwe waarde kost alleen blits, geen blur."""
+    r = font.get_rect(text, size=font.size * scale)
+    out = _new_alpha((r.w + 60, r.h + 60))
+    # Eerst alle glows, dan alle tekst: een glow valt nooit over het buurteken.
+    pen, base = 30 - r.x, 30 + r.y
+    glows, cores = [], []
+    for ch in text:
+        glow, core, (gx, gy), adv = _neon_glyph(ch, font, color, glow_color, scale)
+        if core is not None:
+            x, y = round(pen + gx), base - gy
+            glows.append((glow, (x - 30, y - 30)))
+            cores.append((core, (x, y)))
+        pen += adv
+    out.fblits(glows, pygame.BLEND_PREMULTIPLIED)
+    out.fblits(cores, pygame.BLEND_PREMULTIPLIED)
+    return out, (30, 30), r.size
+
+def draw_neon_hud(dst: Surface, text: str, font: pygame.freetype.Font, pos: tuple, color: tuple, glow_color: tuple, center: bool = False, scale: float = 1.0):
+    """Als draw_neon_text, voor scores en timers: elke nieuwe waarde wordt uit de tekens 0-9 e.d. samengesteld."""
+    return _blit_neon(dst, _compose_neon(text, font, color, glow_color, scale), pos, center)
 
 @dataclass
 class FloatText:
     x: float; y: float; text: str; color: tuple; life: float = 1.0
     def update(self, dt):
         self.y -= 60 * dt
-        self.life -= dt
-    def draw(self, dst, font):
-        if self.life > 0:
-            alpha = int(255 * clamp(self.life, 0, 1))
-            surf, _ = font.render(self.text, fgcolor=self.color)
-            s2 = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
-            s2.blit(surf, (0,0))
-            s2.fill((255,255,255,alpha), special_flags=pygame.BLEND_RGBA_MULT)
-            dst.blit(s2, (self.x, self.y))
+        self.life = max(0.0, self.life - dt)
+    _surf: Surface | None = field(default=None, init=False, repr=False, compare=False)
+    def blit_item(self, font):
+        """(surface, pos) voor een gebundelde dst.fblits() aanroep."""
+        # Eigen kopie van de gecachete glyph, zodat set_alpha per tekst kan
+        # (geen temp-surface + BLEND_RGBA_MULT fill per frame).
+        if self._surf is None: self._surf = _render_text(font, self.text, self.color).copy()
+        self._surf.set_alpha(int(255 * min(1.0, self.life)))
+        return self._surf, (self.x, self.y)
+
+def update_float_texts(texts: list, dt: float):
+    """Update en ruim in-place op (swap-with-last) in een enkele pass: geen nieuwe lijst per frame."""
+    i, n = 0, len(texts)
+    while i < n:
+        t = texts[i]
+        t.update(dt)
+        if t.life <= 0:
+            n -= 1
+            texts[i] = texts[n]
+        else: i += 1
+    del texts[n:]
+
+def draw_float_texts(dst: Surface, texts: list, font: pygame.freetype.Font) -> list:
+    """Tekent alle teksten in een fblits en geeft hun Rects terug (voor dirty-updates)."""
+    # Teksten die buiten beeld zijn gedreven niet meer aan fblits (of display.update) geven.
+    clip = dst.get_clip()
+    items, rects = [], []
+    for t in texts:
+        surf, pos = t.blit_item(font)
+        r = Rect(pos, surf.get_size())
+        if clip.colliderect(r): items.append((surf, pos)); rects.append(r)
+    dst.fblits(items)
+    return rects
+
+def load_highscores() -> dict:
+    data = {"precision": [], "brawl": []}
+    if not CAN_PERSIST or not HS_FILE.exists(): return data
+    try:
+        loaded = _json_loads(HS_FILE.read_bytes())
+        # Eenmalig sorteren bij laden; submit() gaat daarna uit van een gesorteerd board.
+        for mode in data: data[mode] = sorted(loaded.get(mode, []), key=lambda x: x["score"], reverse=True)[:10]
+    except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+        print(f"HIGHSCORES UNREADABLE: {e}", file=sys.stderr)
+    return data
+
+def encode_highscores(data: dict) -> bytes:
+    return _json_dumps(data)
+
+def write_highscores(payload: bytes):
+    """Atomair: eerst naar .tmp, dan os.replace, zodat een crash nooit een half bestand achterlaat."""
+    if not CAN_PERSIST: return
+    tmp = HS_FILE.with_suffix(".tmp")
+    try:
+        tmp.write_bytes(payload)
+        os.replace(tmp, HS_FILE)
+    except OSError as e:
+        print(f"HIGHSCORES NOT SAVED: {e}", file=sys.stderr)
 
 # ------------------------------------------------------------
 # 3. DRAWING
 # ------------------------------------------------------------
-def draw_diamond_logo(dst: Surface, center: tuple, scale: float = 1.0):
-    cx, cy = center
+# Vector-iconen een keer naar een alpha-sprite renderen, daarna alleen blitten.
+_ICON_CACHE: dict[tuple, Surface] = {}
+
+def _blit_icon(dst: Surface, key: tuple, build, center: tuple):
+    surf = _ICON_CACHE.get(key)
+    if surf is None: surf = _ICON_CACHE[key] = build(*key[1:])
+    dst.blit(surf, surf.get_rect(center=center))
+
+def _build_diamond(scale: float) -> Surface:
     w, h = 300 * scale, 150 * scale
+    surf = _new_alpha((int(2*w) + 8, int(2*h) + 8))
+    cx, cy = surf.get_width() // 2, surf.get_height() // 2
     points = [(cx, cy-h), (cx+w, cy), (cx, cy+h), (cx-w, cy)]
-    pygame.draw.polygon(dst, (200, 200, 200), points, width=3)
+    pygame.draw.polygon(surf, (200, 200, 200), points, width=3)
     w2, h2 = w * 0.9, h * 0.9
     points2 = [(cx, cy-h2), (cx+w2, cy), (cx, cy+h2), (cx-w2, cy)]
-    pygame.draw.polygon(dst, (150, 150, 150), points2, width=1)
-    pygame.draw.line(dst, COLORS["GOLD"], (cx-20*scale, cy-20*scale), (cx+20*scale, cy+20*scale), int(4*scale))
-    pygame.draw.line(dst, COLORS["GOLD"], (cx+20*scale, cy-20*scale), (cx-20*scale, cy+20*scale), int(4*scale))
+    pygame.draw.polygon(surf, (150, 150, 150), points2, width=1)
+    pygame.draw.line(surf, GOLD, (cx-20*scale, cy-20*scale), (cx+20*scale, cy+20*scale), int(4*scale))
+    pygame.draw.line(surf, GOLD, (cx+20*scale, cy-20*scale), (cx-20*scale, cy+20*scale), int(4*scale))
+    return surf
+
+def draw_diamond_logo(dst: Surface, center: tuple, scale: float = 1.0):
+    # Schaal afronden: bijna-gelijke floats delen dezelfde sprite.
+    _blit_icon(dst, ("diamond", round(scale, 2)), _build_diamond, center)
+
+@functools.lru_cache(maxsize=4)
+def _pole_strip(w: int, h: int) -> Surface:
+    """Strepen + glans een keer, 40px (een periode) hoger dan de paal: scrollen = andere area."""
+    strip = pygame.Surface((w, h + 40)).convert()
+    strip.fill((255, 255, 255))
+    for y in range(-40, h + 80, 40):
+        pygame.draw.polygon(strip, (220, 0, 0), [(0, y), (w, y+20), (w, y+30), (0, y+10)])
+        pygame.draw.polygon(strip, (0, 0, 220), [(0, y+20), (w, y+40), (w, y+50), (0, y+30)])
+    strip.fill((255, 255, 255), Rect(4, 0, 4, h + 40))
+    return strip
 
 def draw_barber_pole(dst: Surface, rect: Rect):
-    pygame.draw.rect(dst, (50, 50, 50), rect.inflate(4, 20), border_radius=4)
-    pygame.draw.rect(dst, (255, 255, 255), rect)
-    clip = pygame.Surface(rect.size, pygame.SRCALPHA)
-    offset = -(pygame.time.get_ticks() / 15) % 40
-    for y in range(int(offset)-40, rect.height + 40, 40):
-        pygame.draw.polygon(clip, (220, 0, 0), [(0, y), (rect.width, y+20), (rect.width, y+30), (0, y+10)])
-        pygame.draw.polygon(clip, (0, 0, 220), [(0, y+20), (rect.width, y+40), (rect.width, y+50), (0, y+30)])
-    dst.blit(clip, rect)
-    pygame.draw.rect(dst, (255,255,255), Rect(rect.x+4, rect.y, 4, rect.height)) 
+    # De kap (rand) is statisch en zit in de achtergrond-cache.
+    offset = int(-(pygame.time.get_ticks() / 15) % 40)
+    dst.blit(_pole_strip(rect.width, rect.height), rect, area=Rect(0, 40 - offset, rect.width, rect.height))
 
-def draw_detailed_character(dst: Surface, x, y, archetype="tank", scale=1.0):
+@functools.lru_cache(maxsize=16)
+def _character_sprite(archetype: str, scale: float) -> tuple[Surface, tuple]:
+    """Rendert een personage een keer; geeft (sprite, ankerpunt binnen de sprite)."""
+    ox, oy = int(90*scale) + 10, int(120*scale) + 10
+    surf = _new_alpha((2*ox, int(240*scale) + 20))
+    x, y = ox, oy
     w, h = 70 * scale, 100 * scale
     head_r = 28 * scale
     shirt_rect = Rect(x - w//2, y - h//1.5, w, h)
-    pygame.draw.rect(dst, (15, 15, 15), shirt_rect, border_radius=int(10*scale))
+    pygame.draw.rect(surf, (15, 15, 15), shirt_rect, border_radius=int(10*scale))
     if archetype == "tank":
-        pygame.draw.polygon(dst, COLORS["SKIN"], [(x-10*scale, y-h//1.5), (x+10*scale, y-h//1.5), (x, y-h//1.5 + 15*scale)])
-    pygame.draw.line(dst, COLORS["SKIN"], (x-w//2, y-h//2), (x-w//2 - 15*scale, y), int(14*scale))
-    pygame.draw.line(dst, COLORS["SKIN"], (x+w//2, y-h//2), (x+w//2 + 15*scale, y), int(14*scale))
-    pygame.draw.line(dst, COLORS["TATTOO"], (x-w//2-5*scale, y-h//3), (x-w//2 - 10*scale, y-10*scale), int(10*scale))
-    pygame.draw.line(dst, COLORS["TATTOO"], (x+w//2+5*scale, y-h//3), (x+w//2 + 10*scale, y-10*scale), int(10*scale))
+        pygame.draw.polygon(surf, SKIN, [(x-10*scale, y-h//1.5), (x+10*scale, y-h//1.5), (x, y-h//1.5 + 15*scale)])
+    pygame.draw.line(surf, SKIN, (x-w//2, y-h//2), (x-w//2 - 15*scale, y), int(14*scale))
+    pygame.draw.line(surf, SKIN, (x+w//2, y-h//2), (x+w//2 + 15*scale, y), int(14*scale))
+    pygame.draw.line(surf, TATTOO, (x-w//2-5*scale, y-h//3), (x-w//2 - 10*scale, y-10*scale), int(10*scale))
+    pygame.draw.line(surf, TATTOO, (x+w//2+5*scale, y-h//3), (x+w//2 + 10*scale, y-10*scale), int(10*scale))
     if archetype == "tank":
-        pygame.draw.rect(dst, (20, 20, 30), Rect(x-w//2+5, y+h//3, w-10, h//1.5))
-        pygame.draw.rect(dst, (100, 70, 20), Rect(x-w//2, y+h, w//2-2, 15*scale)) 
-        pygame.draw.rect(dst, (100, 70, 20), Rect(x+2, y+h, w//2-2, 15*scale))
+        pygame.draw.rect(surf, (20, 20, 30), Rect(x-w//2+5, y+h//3, w-10, h//1.5))
+        pygame.draw.rect(surf, (100, 70, 20), Rect(x-w//2, y+h, w//2-2, 15*scale)) 
+        pygame.draw.rect(surf, (100, 70, 20), Rect(x+2, y+h, w//2-2, 15*scale))
     else:
-        pygame.draw.rect(dst, COLORS["DENIM"], Rect(x-w//2+5, y+h//3, w-10, h//1.5))
-        pygame.draw.rect(dst, (10, 10, 10), Rect(x-w//2, y+h, w//2-2, 15*scale))
-        pygame.draw.rect(dst, (10, 10, 10), Rect(x+2, y+h, w//2-2, 15*scale))
-    pygame.draw.circle(dst, COLORS["SKIN"], (x, y - h//1.2), head_r)
+        pygame.draw.rect(surf, DENIM, Rect(x-w//2+5, y+h//3, w-10, h//1.5))
+        pygame.draw.rect(surf, (10, 10, 10), Rect(x-w//2, y+h, w//2-2, 15*scale))
+        pygame.draw.rect(surf, (10, 10, 10), Rect(x+2, y+h, w//2-2, 15*scale))
+    pygame.draw.circle(surf, SKIN, (x, y - h//1.2), head_r)
     if archetype == "tank":
-        pygame.draw.arc(dst, (20, 20, 20), Rect(x-head_r, y-h//1.2-head_r, head_r*2, head_r*2), 0, 3.14, int(6*scale))
-        pygame.draw.polygon(dst, (20, 20, 20), [(x-head_r, y-h//1.2), (x+head_r, y-h//1.2), (x+head_r*0.8, y-h//1.2+25*scale), (x-head_r*0.8, y-h//1.2+25*scale)])
+        pygame.draw.arc(surf, (20, 20, 20), Rect(x-head_r, y-h//1.2-head_r, head_r*2, head_r*2), 0, 3.14, int(6*scale))
+        pygame.draw.polygon(surf, (20, 20, 20), [(x-head_r, y-h//1.2), (x+head_r, y-h//1.2), (x+head_r*0.8, y-h//1.2+25*scale), (x-head_r*0.8, y-h//1.2+25*scale)])
     else:
         for i in range(-3, 4):
-            pygame.draw.circle(dst, (20, 20, 20), (x + i*7*scale, y - h//1.2 - 15*scale), 8*scale)
-        pygame.draw.circle(dst, (10,10,10), (x-8*scale, y-h//1.2), 8*scale, width=2)
-        pygame.draw.circle(dst, (10,10,10), (x+8*scale, y-h//1.2), 8*scale, width=2)
-        pygame.draw.line(dst, (10,10,10), (x-4*scale, y-h//1.2), (x+4*scale, y-h//1.2), 2)
-        pygame.draw.line(dst, (20,20,20), (x-10*scale, y-h//1.2+10*scale), (x+10*scale, y-h//1.2+10*scale), int(3*scale))
-        draw_diamond_logo(dst, (x+40*scale, y), scale=0.05)
-
-def draw_environment(dst: Surface):
-    dst.fill(COLORS["WALL_DARK"])
-    pygame.draw.rect(dst, COLORS["FLOOR_WOOD"], Rect(0, HEIGHT-150, WIDTH, 150))
+            pygame.draw.circle(surf, (20, 20, 20), (x + i*7*scale, y - h//1.2 - 15*scale), 8*scale)
+        pygame.draw.circle(surf, (10,10,10), (x-8*scale, y-h//1.2), 8*scale, width=2)
+        pygame.draw.circle(surf, (10,10,10), (x+8*scale, y-h//1.2), 8*scale, width=2)
+        pygame.draw.line(surf, (10,10,10), (x-4*scale, y-h//1.2), (x+4*scale, y-h//1.2), 2)
+        pygame.draw.line(surf, (20,20,20), (x-10*scale, y-h//1.2+10*scale), (x+10*scale, y-h//1.2+10*scale), int(3*scale))
+        draw_diamond_logo(surf, (x+40*scale, y), scale=0.05)
+    return surf, (ox, oy)
+
+def character_blit_item(x, y, archetype="tank", scale=1.0) -> tuple:
+    """(sprite, pos) voor een gebundelde dst.fblits() aanroep."""
+    surf, (ox, oy) = _character_sprite(archetype, scale)
+    return surf, (x - ox, y - oy)
+
+def draw_detailed_character(dst: Surface, x, y, archetype="tank", scale=1.0):
+    return dst.blit(*character_blit_item(x, y, archetype, scale))
+
+POLE_RECTS = (Rect(20, 150, 40, 200), Rect(WIDTH-60, 150, 40, 200))
+# Schermgebied dat de paal-animatie elk frame verandert (incl. de rand).
+POLE_DIRTY = [r.inflate(4, 20) for r in POLE_RECTS]
+
+# Alles behalve de palen is statisch: een keer renderen, daarna alleen blitten.
+_BG_CACHE: Surface | None = None
+
+def _build_environment() -> Surface:
+    surf = pygame.Surface((WIDTH, HEIGHT)).convert()
+    surf.fill(WALL_DARK)
+    pygame.draw.rect(surf, FLOOR_WOOD, Rect(0, HEIGHT-150, WIDTH, 150))
     for i in range(0, WIDTH, 60):
-        pygame.draw.line(dst, (90, 60, 40), (i, HEIGHT-150), (i-40, HEIGHT), 2)
+        pygame.draw.line(surf, (90, 60, 40), (i, HEIGHT-150), (i-40, HEIGHT), 2)
     for i in range(3):
         x = 150 + i * 380
-        pygame.draw.rect(dst, (10,10,10), Rect(x, 100, 220, 300))
-        pygame.draw.rect(dst, (40, 40, 50), Rect(x+10, 110, 200, 280))
-        pygame.draw.line(dst, (60,60,70), (x+20, 350), (x+100, 120), 2)
-        draw_diamond_logo(dst, (x+110, 160), scale=0.3)
-    draw_barber_pole(dst, Rect(20, 150, 40, 200))
-    draw_barber_pole(dst, Rect(WIDTH-60, 150, 40, 200))
+        pygame.draw.rect(surf, (10,10,10), Rect(x, 100, 220, 300))
+        pygame.draw.rect(surf, (40, 40, 50), Rect(x+10, 110, 200, 280))
+        pygame.draw.line(surf, (60,60,70), (x+20, 350), (x+100, 120), 2)
+        draw_diamond_logo(surf, (x+110, 160), scale=0.3)
+    for r in POLE_RECTS: pygame.draw.rect(surf, (50, 50, 50), r.inflate(4, 20), border_radius=4)
     f = load_font(48)
-    draw_neon_text(dst, "IT'S A CUT-THROAT BUSINESS", f, (WIDTH//2, 50), COLORS["NEON_RED"], COLORS["NEON_GLOW"], center=True)
+    draw_neon_text(surf, "IT'S A CUT-THROAT BUSINESS", f, (WIDTH//2, 50), NEON_RED, NEON_GLOW, center=True)
+    return surf
+
+def environment_surface() -> Surface:
+    global _BG_CACHE
+    if _BG_CACHE is None: _BG_CACHE = _build_environment()
+    return _BG_CACHE
+
+@functools.lru_cache(maxsize=8)
+def _shade(size: tuple, alpha: int) -> Surface:
+    """Zwarte verduistering: opaak + surface-alpha, gedeeld over alle scene-instanties."""
+    s = pygame.Surface(size).convert()
+    s.fill((0, 0, 0))
+    s.set_alpha(alpha)
+    return s
+
+def draw_environment(dst: Surface, base: Surface | None = None):
+    """Blit de statische achtergrond (of een scene-eigen kopie daarvan) + de palen."""
+    dst.blit(environment_surface() if base is None else base, (0, 0))
+    for r in POLE_RECTS: draw_barber_pole(dst, r)
 
 # ------------------------------------------------------------
 # 4. GAME APP (ASYNC PATCHED)
 # ------------------------------------------------------------
 class GameApp:
     def __init__(self):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        # Render-caches (achtergrond, neon-tekst) worden lui gevuld en met
+        # convert()/convert_alpha() naar dit display-formaat gezet: dus pas na set_mode.
+        # Expliciet 32-bit, zodat convert() het snelle 32-bit opaque formaat oplevert.
+        self.screen = None
+        if sys.platform != "emscripten":
+            # Desktop: vsync laat de monitor het tempo bepalen (tick() blijft voor dt).
+            # Vereist SCALED; niet elke driver kan het, dan terug naar de gewone mode.
+            try: self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, depth=32, vsync=1)
+            except pygame.error as e: print(f"VSYNC UNAVAILABLE: {e}", file=sys.stderr)
+        if self.screen is None: self.screen = pygame.display.set_mode((WIDTH, HEIGHT), depth=32)
         pygame.display.set_caption("BIG BARBER BATTLE")
         self.clock = pygame.time.Clock()
         self.running = True
         self.font = load_font(32)
         self.font_big = load_font(64)
         
-        # In web mode slaan we highscores lokaal niet op, 
-        # want dat kan niet in WASM zonder LocalStorage bridge.
-        # We gebruiken een tijdelijke dict.
-        self.highscores = {"precision": [], "brawl": []}
+        # In web mode blijft dit een tijdelijke dict (zie CAN_PERSIST).
+        self.highscores = load_highscores()
+        self._hs_hash = hash(encode_highscores(self.highscores))
+        # Eén worker: schrijven blokkeert het frame niet en blijft in volgorde.
+        self._save_exec = concurrent.futures.ThreadPoolExecutor(max_workers=1) if CAN_PERSIST else None
         
         self.scenes = [MenuScene(self)]
         self.shake = 0.0
+        # Alleen tijdens shake tekenen we via een tussenbuffer; die maken we een keer.
+        self._shake_buf = Surface((WIDTH, HEIGHT)).convert()
 
     def push(self, s): self.scenes.append(s)
     def pop(self): self.scenes.pop() if self.scenes else None
@@ -207,31 +402,51 @@ class GameApp:
 
     def trigger_shake(self, amount=0.2): self.shake = amount
 
+    def save_highscores(self):
+        payload = encode_highscores(self.highscores)
+        h = hash(payload)
+        if h == self._hs_hash: return
+        self._hs_hash = h
+        if self._save_exec: self._save_exec.submit(write_highscores, payload)
+
     async def run(self):
         """ ASYNC RUN LOOP FOR WEB """
-        while self.running and self.scenes:
-            dt = self.clock.tick(FPS) / 1000.0
+        # Scenes mogen uit draw() een lijst gewijzigde Rects teruggeven; None = alles.
+        shown, shown_off = None, (0,0)
+        # Vaste objecten een keer als locals: scheelt attribuut-lookups per frame.
+        scenes, screen, shake_buf = self.scenes, self.screen, self._shake_buf
+        tick, get_events, QUIT = self.clock.tick, pygame.event.get, pygame.QUIT
+        flip, update = pygame.display.flip, pygame.display.update
+        while self.running and scenes:
+            dt = tick(FPS) / 1000.0
             
-            for e in pygame.event.get():
-                if e.type == pygame.QUIT: self.running = False
-                else: self.scenes[-1].handle_event(e)
+            # scenes[-1] per event: een event kan een nieuwe scene pushen.
+            for e in get_events():
+                if e.type == QUIT: self.running = False
+                else: scenes[-1].handle_event(e)
             
-            self.scenes[-1].update(dt)
+            scenes[-1].update(dt)
             
             off = (0,0)
             if self.shake > 0:
                 self.shake -= dt
                 off = (random.randint(-4,4), random.randint(-4,4))
             
-            base = Surface((WIDTH, HEIGHT))
-            self.scenes[-1].draw(base)
-            self.screen.blit(base, off)
+            top = scenes[-1]
+            if off == (0,0): dirty = top.draw(screen)
+            else:
+                dirty = top.draw(shake_buf)
+                screen.blit(shake_buf, off)
             
-            pygame.display.flip()
+            if dirty is None or top is not shown or off != shown_off: flip()
+            elif dirty: update(dirty)
+            shown, shown_off = top, off
             
             # CRUCIAAL: Geef controle terug aan de browser
             await asyncio.sleep(0)
             
+        self.save_highscores()
+        if self._save_exec: self._save_exec.shutdown(wait=True)
         pygame.quit()
 
 # ------------------------------------------------------------
@@ -241,6 +456,10 @@ class MenuScene:
     def __init__(self, app):
         self.app = app
         self.sel = 0
+        # Vaste tint-lagen per helft, een keer gemaakt i.p.v. elk frame een overlay.
+        self._tint_lit = _shade((WIDTH//2, HEIGHT), 100)
+        self._tint_dim = _shade((WIDTH//2, HEIGHT), 180)
+        self._shown_sel = None
     def handle_event(self, e):
         if e.type == pygame.KEYDOWN:
             if e.key in (pygame.K_LEFT, pygame.K_a): self.sel = 0
@@ -257,23 +476,24 @@ class MenuScene:
     def update(self, dt): pass
     def draw(self, dst):
         draw_environment(dst)
-        overlay = Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        l_a = 100 if self.sel == 0 else 180
-        r_a = 100 if self.sel == 1 else 180
-        pygame.draw.rect(overlay, (0,0,0,l_a), Rect(0,0,WIDTH//2,HEIGHT))
-        pygame.draw.rect(overlay, (0,0,0,r_a), Rect(WIDTH//2,0,WIDTH//2,HEIGHT))
-        dst.blit(overlay, (0,0))
+        dst.blit(self._tint_lit if self.sel == 0 else self._tint_dim, (0,0))
+        dst.blit(self._tint_lit if self.sel == 1 else self._tint_dim, (WIDTH//2,0))
         draw_diamond_logo(dst, (WIDTH//4, HEIGHT//2), scale=0.8)
-        draw_neon_text(dst, "PRECISION CUT", self.app.font, (WIDTH//4, 180), COLORS["WHITE"], COLORS["DENIM"], center=True)
-        draw_detailed_character(dst, WIDTH*0.75 - 50, HEIGHT//2 + 50, "tank", 1.2)
-        draw_detailed_character(dst, WIDTH*0.75 + 50, HEIGHT//2 + 50, "tech", 1.2)
-        draw_neon_text(dst, "STREET BRAWL", self.app.font, (WIDTH*0.75, 180), COLORS["WHITE"], COLORS["NEON_RED"], center=True)
-        t, _ = self.app.font.render("TAP LEFT OR RIGHT TO START", fgcolor=COLORS["WHITE"])
+        draw_neon_text(dst, "PRECISION CUT", self.app.font, (WIDTH//4, 180), WHITE, DENIM, center=True)
+        dst.fblits([character_blit_item(WIDTH*0.75 - 50, HEIGHT//2 + 50, "tank", 1.2),
+                    character_blit_item(WIDTH*0.75 + 50, HEIGHT//2 + 50, "tech", 1.2)])
+        draw_neon_text(dst, "STREET BRAWL", self.app.font, (WIDTH*0.75, 180), WHITE, NEON_RED, center=True)
+        t = _render_text(self.app.font, "TAP LEFT OR RIGHT TO START", WHITE)
         dst.blit(t, (WIDTH//2 - t.get_width()//2, HEIGHT-40))
+        # Zonder selectiewissel bewegen alleen de palen.
+        dirty = POLE_DIRTY if self.sel == self._shown_sel else None
+        self._shown_sel = self.sel
+        return dirty
 
 class PrecisionCutGame:
     def __init__(self, app):
         self.app = app; self.time = 45.0; self.score = 0; self.combo = 0; self.mouse = (WIDTH//2, HEIGHT//2); self.texts = []
+        self._last_dirty = []
     def handle_event(self, e):
         if e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE: self.app.pop()
         elif e.type == pygame.MOUSEMOTION: self.mouse = e.pos
@@ -284,77 +504,103 @@ class PrecisionCutGame:
                 pts = 10 + self.combo * 5
                 self.score += pts; self.combo += 1
                 txt = random.choice(["FRESH!", "CLEAN!", "SHARP!", "BIG!"])
-                self.texts.append(FloatText(mx, my, txt, COLORS["GREEN"]))
+                self.texts.append(FloatText(mx, my, txt, GREEN))
             else:
                 self.combo = 0
-                self.texts.append(FloatText(mx, my, "OOPS", COLORS["NEON_RED"]))
+                self.texts.append(FloatText(mx, my, "OOPS", NEON_RED))
     def update(self, dt):
         self.time -= dt
         if self.time <= 0: self.app.replace(HighScoreGate(self.app, "precision", self.score))
-        for t in self.texts: t.update(dt)
-        self.texts = [t for t in self.texts if t.life > 0]
+        update_float_texts(self.texts, dt)
     def draw(self, dst):
         draw_environment(dst)
         rect = Rect(WIDTH//2 - 150, HEIGHT//2 - 180, 300, 360)
         pygame.draw.rect(dst, (20, 20, 20), rect, border_radius=20)
-        pygame.draw.rect(dst, COLORS["WHITE"], rect, width=3, border_radius=20)
-        pygame.draw.circle(dst, COLORS["SKIN"], rect.center, 80)
+        pygame.draw.rect(dst, WHITE, rect, width=3, border_radius=20)
+        pygame.draw.circle(dst, SKIN, rect.center, 80)
         pygame.draw.rect(dst, (50, 200, 50, 50), Rect(WIDTH//2-90, HEIGHT//2-20, 180, 40))
         mx, my = self.mouse
-        pygame.draw.rect(dst, COLORS["GOLD"], Rect(mx-20, my-30, 40, 60), border_radius=5)
-        draw_neon_text(dst, f"SCORE: {self.score}", self.app.font, (50, 50), COLORS["WHITE"], COLORS["DENIM"])
-        draw_neon_text(dst, f"TIME: {int(self.time)}", self.app.font, (WIDTH-200, 50), COLORS["NEON_RED"], COLORS["NEON_GLOW"])
-        for t in self.texts: t.draw(dst, self.app.font)
+        dirty = POLE_DIRTY + [
+            pygame.draw.rect(dst, GOLD, Rect(mx-20, my-30, 40, 60), border_radius=5),
+            draw_neon_hud(dst, f"SCORE: {self.score}", self.app.font, (50, 50), WHITE, DENIM),
+            draw_neon_hud(dst, f"TIME: {int(self.time)}", self.app.font, (WIDTH-200, 50), NEON_RED, NEON_GLOW),
+        ] + draw_float_texts(dst, self.texts, self.app.font)
+        # Ook de vorige Rects, zodat oude posities (cursor, teksten) gewist worden.
+        out = dirty + self._last_dirty; self._last_dirty = dirty
+        return out
+
+@dataclass(slots=True)
+class Fighter:
+    x: float; hp: float; archetype: str
+
+# HP-balken (p1, p2): de lege track zit in de achtergrond, alleen de vulling is dynamisch.
+HP_BARS = (Rect(50, 40, 400, 30), Rect(WIDTH-50-400, 40, 400, 30))
+FLOOR_Y = HEIGHT - 120
+ARENA_LEFT, ARENA_RIGHT = 100, WIDTH - 100
 
 class StreetBrawlGame:
     def __init__(self, app):
-        self.app = app; self.p1 = {"x": WIDTH*0.3, "hp": 100}; self.p2 = {"x": WIDTH*0.7, "hp": 100}; self.timer = 99.0; self.texts = []
+        self.app = app; self.p1 = Fighter(WIDTH*0.3, 100, "tank"); self.p2 = Fighter(WIDTH*0.7, 100, "tech"); self.timer = 99.0; self.texts = []
+        # Achtergrond + lege HP-balken in een keer; per frame alleen de vulling.
+        self._bg = environment_surface().copy()
+        for bar in HP_BARS: self._bg.fill(BLACK, bar)
+        self._last_dirty = []
     def handle_event(self, e):
         if e.type == pygame.KEYDOWN:
             if e.key == pygame.K_ESCAPE: self.app.pop()
             if e.key in (pygame.K_j, pygame.K_k): self.attack()
         elif e.type == pygame.MOUSEBUTTONDOWN:
             mx, my = e.pos
-            if mx < WIDTH//2: self.p1["x"] -= 20
+            if mx < WIDTH//2: self.p1.x -= 20
             else: self.attack()
     def attack(self):
-        dist = abs(self.p1["x"] - self.p2["x"])
-        if dist < 150:
-            dmg = random.randint(8, 15); self.p2["hp"] -= dmg
+        p1, p2 = self.p1, self.p2
+        if abs(p1.x - p2.x) < 150:
+            dmg = random.randint(8, 15); p2.hp -= dmg
             self.app.trigger_shake(0.2)
-            self.texts.append(FloatText(self.p2["x"], HEIGHT//2, f"-{dmg}", COLORS["ORANGE"]))
-            self.p2["x"] += 60
-        else: self.texts.append(FloatText(self.p1["x"], HEIGHT//2-100, "MISS", COLORS["WHITE"]))
+            self.texts.append(FloatText(p2.x, HEIGHT//2, f"-{dmg}", ORANGE))
+            p2.x += 60
+        else: self.texts.append(FloatText(p1.x, HEIGHT//2-100, "MISS", WHITE))
     def update(self, dt):
+        p1, p2 = self.p1, self.p2
         self.timer -= dt
-        if self.timer <= 0 or self.p1["hp"] <= 0 or self.p2["hp"] <= 0:
-            sc = int(self.p1["hp"] + self.timer)
+        if self.timer <= 0 or p1.hp <= 0 or p2.hp <= 0:
+            sc = int(p1.hp + self.timer)
             self.app.replace(HighScoreGate(self.app, "brawl", sc))
         keys = pygame.key.get_pressed()
-        if keys[pygame.K_a]: self.p1["x"] -= 300 * dt
-        if keys[pygame.K_d]: self.p1["x"] += 300 * dt
-        dist = self.p1["x"] - self.p2["x"]
-        if abs(dist) < 100: self.p2["x"] += 200 * dt
-        elif abs(dist) > 300: self.p2["x"] -= 100 * dt
-        self.p1["x"] = clamp(self.p1["x"], 100, WIDTH-100)
-        self.p2["x"] = clamp(self.p2["x"], 100, WIDTH-100)
-        for t in self.texts: t.update(dt)
+        move = keys[pygame.K_d] - keys[pygame.K_a]  # -1, 0 of 1
+        # Posities lokaal rekenen, een keer terugschrijven.
+        x1, x2 = p1.x + 300 * dt * move, p2.x
+        dist = abs(x1 - x2)
+        if dist < 100: x2 += 200 * dt
+        elif dist > 300: x2 -= 100 * dt
+        p1.x = clamp(x1, ARENA_LEFT, ARENA_RIGHT)
+        p2.x = clamp(x2, ARENA_LEFT, ARENA_RIGHT)
+        update_float_texts(self.texts, dt)
     def draw(self, dst):
-        draw_environment(dst)
-        floor_y = HEIGHT - 120
-        draw_detailed_character(dst, self.p1["x"], floor_y, "tank", 1.5)
-        draw_detailed_character(dst, self.p2["x"], floor_y, "tech", 1.5)
-        bar_w = 400
-        pygame.draw.rect(dst, COLORS["BLACK"], Rect(50, 40, bar_w, 30))
-        pygame.draw.rect(dst, COLORS["ORANGE"], Rect(50, 40, bar_w * (self.p1["hp"]/100), 30))
-        pygame.draw.rect(dst, COLORS["BLACK"], Rect(WIDTH-50-bar_w, 40, bar_w, 30))
-        pygame.draw.rect(dst, COLORS["GREEN"], Rect(WIDTH-50-bar_w, 40, bar_w * (self.p2["hp"]/100), 30))
-        draw_neon_text(dst, str(int(self.timer)), self.app.font_big, (WIDTH//2, 60), COLORS["WHITE"], COLORS["GOLD"], center=True)
-        for t in self.texts: t.draw(dst, self.app.font)
+        draw_environment(dst, self._bg)
+        dirty = POLE_DIRTY + list(HP_BARS) + [
+            draw_detailed_character(dst, self.p1.x, FLOOR_Y, self.p1.archetype, 1.5),
+            draw_detailed_character(dst, self.p2.x, FLOOR_Y, self.p2.archetype, 1.5),
+        ]
+        for bar, hp, col in ((HP_BARS[0], self.p1.hp, ORANGE), (HP_BARS[1], self.p2.hp, GREEN)):
+            dst.fill(col, (bar.x, bar.y, max(0, int(bar.w * hp / 100)), bar.h))
+        dirty.append(draw_neon_hud(dst, str(int(self.timer)), self.app.font_big, (WIDTH//2, 60), WHITE, GOLD, center=True))
+        dirty += draw_float_texts(dst, self.texts, self.app.font)
+        out = dirty + self._last_dirty; self._last_dirty = dirty
+        return out
 
 class HighScoreGate:
     def __init__(self, app, mode, score):
         self.app = app; self.mode = mode; self.score = score; self.name = ""
+        self._overlay = _shade((WIDTH, HEIGHT), 200)
+        # Alles wat niet verandert (achtergrond, verduistering, titel, score) een keer samenvoegen.
+        self._static = environment_surface().copy()
+        self._static.blit(self._overlay, (0,0))
+        draw_neon_text(self._static, "GAME OVER", app.font_big, (WIDTH//2, 150), NEON_RED, NEON_GLOW, center=True)
+        t1 = _render_text(app.font, f"FINAL SCORE: {score}", WHITE)
+        self._static.blit(t1, (WIDTH//2 - t1.get_width()//2, 300))
+        self._last_dirty = []
     def handle_event(self, e):
         if e.type == pygame.KEYDOWN:
             if e.key == pygame.K_RETURN: self.submit()
@@ -362,20 +608,25 @@ class HighScoreGate:
             elif e.unicode.isalnum() and len(self.name)<10: self.name += e.unicode
         elif e.type == pygame.MOUSEBUTTONDOWN: self.submit()
     def submit(self):
-        self.app.highscores[self.mode].append({"name": self.name or "ANON", "score": self.score})
-        self.app.highscores[self.mode] = sorted(self.app.highscores[self.mode], key=lambda x: x["score"], reverse=True)[:10]
+        board = self.app.highscores[self.mode]
+        # Board staat aflopend gesorteerd: laatste plek is de drempel, invoegen in O(log n).
+        if len(board) < 10 or self.score > board[-1]["score"]:
+            bisect.insort(board, {"name": self.name or "ANON", "score": self.score}, key=lambda x: -x["score"])
+            del board[10:]
+            self.app.save_highscores()
         self.app.pop()
     def update(self, dt): pass
     def draw(self, dst):
-        draw_environment(dst)
-        overlay = Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0,0,0,200))
-        dst.blit(overlay, (0,0))
-        draw_neon_text(dst, "GAME OVER", self.app.font_big, (WIDTH//2, 150), COLORS["NEON_RED"], COLORS["NEON_GLOW"], center=True)
-        t1, _ = self.app.font.render(f"FINAL SCORE: {self.score}", fgcolor=COLORS["WHITE"])
-        t2, _ = self.app.font.render(f"NAME: {self.name}_", fgcolor=COLORS["GOLD"])
-        dst.blit(t1, (WIDTH//2 - t1.get_width()//2, 300))
-        dst.blit(t2, (WIDTH//2 - t2.get_width()//2, 400))
+        dst.blit(self._static, (0,0))
+        # De palen draaien door onder de verduistering: per paal alleen dat stuk overlay.
+        for r in POLE_RECTS:
+            draw_barber_pole(dst, r)
+            dst.blit(self._overlay, r, r)
+        t2 = _render_text(self.app.font, f"NAME: {self.name}_", GOLD)
+        # Alleen de palen en de naamregel veranderen.
+        dirty = POLE_DIRTY + [dst.blit(t2, (WIDTH//2 - t2.get_width()//2, 400))]
+        out = dirty + self._last_dirty; self._last_dirty = dirty
+        return out
 
 # ------------------------------------------------------------
 # 6. MAIN EXECUTION (ASYNC)